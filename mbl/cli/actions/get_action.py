@@ -17,10 +17,24 @@ def execute(args):
     ssh.SUPPRESS_PROGRESS = args.quiet
 
     with ssh.SSHSession(dev) as ssh_session:
-        ssh_session.get(
-            remote_path=args.src_path,
-            local_path=args.dst_path,
-            recursive=args.recursive,
-        )
+        if args.recursive:
+            # sftp can't transfer directories, so use scp.
+            ssh_session.get(
+                remote_path=args.src_path,
+                local_path=args.dst_path,
+                recursive=args.recursive,
+            )
+        else:
+            try:
+                ssh_session.get_sftp(
+                    remote_path=args.src_path, local_path=args.dst_path
+                )
+            except ssh.SFTPUnavailableError:
+                # Prefer sftp, but the device may only support scp.
+                ssh_session.get(
+                    remote_path=args.src_path,
+                    local_path=args.dst_path,
+                    recursive=False,
+                )
 
     print("\n\nTransfer completed.")
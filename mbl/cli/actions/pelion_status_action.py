@@ -5,8 +5,6 @@
 
 """pelion-status action handler."""
 
-import shlex
-
 from mbl.cli.utils.ssh import SSHCallError, SSHSession
 
 from . import utils
@@ -18,11 +16,7 @@ def execute(args):
     with SSHSession(device) as ssh:
         try:
             output = ssh.run_cmd(
-                "{} --get-pelion-status".format(
-                    shlex.quote(utils.PROVISIONING_UTIL_PATH)
-                ),
-                check=True,
-                writeout=False,
+                utils.PELION_STATUS_CMD, check=True, writeout=False
             )
         except SSHCallError:
             raise PelionConfigurationError(
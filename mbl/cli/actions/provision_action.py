@@ -157,8 +157,4 @@ def _remove_remote_dir(path, ssh=None, address=None, hostname=None):
 
 @utils.ssh_session
 def _provision_device(ssh=None, address=None, hostname=None):
-    ssh.run_cmd(
-        "{} --provision".format(shlex.quote(utils.PROVISIONING_UTIL_PATH)),
-        check=True,
-        writeout=True,
-    )
+    ssh.run_cmd(utils.PROVISION_CMD, check=True, writeout=True)
@@ -18,10 +18,21 @@ def execute(args):
     ssh.SUPPRESS_PROGRESS = args.quiet
 
     with ssh.SSHSession(dev) as ssh_session:
-        ssh_session.put(
-            local_path=args.src_path,
-            remote_path=args.dst_path,
-            recursive=args.recursive,
-        )
+        if args.recursive:
+            ssh_session.put_tree(
+                local_path=args.src_path, remote_path=args.dst_path
+            )
+        else:
+            try:
+                ssh_session.put_sftp(
+                    local_path=args.src_path, remote_path=args.dst_path
+                )
+            except ssh.SFTPUnavailableError:
+                # Prefer sftp, but the device may only support scp.
+                ssh_session.put(
+                    local_path=args.src_path,
+                    remote_path=args.dst_path,
+                    recursive=False,
+                )
 
     print("\n\nTransfer completed.")
@@ -6,6 +6,7 @@
 """Action handler helper functions/classes."""
 
 import functools
+import shlex
 import socket
 
 from mbl.cli.utils import device, file_handler, ssh
@@ -15,6 +16,12 @@ from mbl.cli.utils import device, file_handler, ssh
 # Lives here until there's a need to move it to its own file.
 PROVISIONING_UTIL_PATH = "/opt/arm/pelion-provisioning-util"
 
+# Remote shell commands to run the "pelion-provisioning-util".
+PELION_STATUS_CMD = "{} --get-pelion-status".format(
+    shlex.quote(PROVISIONING_UTIL_PATH)
+)
+PROVISION_CMD = "{} --provision".format(shlex.quote(PROVISIONING_UTIL_PATH))
+
 
 def ssh_session(func):
     """SSH session decorator.
@@ -13,6 +13,7 @@ import sys
 import traceback
 import pkg_resources
 from mbl.cli.args import parser
+from mbl.cli.utils import ssh
 
 
 class ExitCode(enum.Enum):
@@ -28,7 +29,13 @@ def _print_version():
 
 
 def _run(args):
-    args.func(args)
+    # The SSHSessions opened by an action share a pooled connection to the
+    # device, so the key exchange and authentication are done once per
+    # command. The connections live until the command completes.
+    try:
+        args.func(args)
+    finally:
+        ssh.SSHSession.shutdown_pool()
 
 
 def _set_error_code(error):
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Copyright (c) 2019 Arm Limited and Contributors. All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Concurrent data transfer to multiple devices using asyncssh.
+
+`SSHSession` in the ssh module handles a single device, and blocks while
+connecting and transferring data. The coroutines in this module connect to,
+and transfer data to, a set of devices concurrently, so the time taken for a
+batch of devices is close to the time taken for the slowest device.
+
+asyncssh is an optional dependency, install it with `pip install
+mbl-cli[async]`.
+"""
+
+import asyncio
+
+import asyncssh
+
+from . import ssh
+
+
+async def put_many(devices, local_path, remote_path):
+    """Send a file to each device in devices via sftp.
+
+    A failure to transfer to one device doesn't stop the transfers to the
+    other devices.
+
+    :param devices list: DeviceInfo objects to send the file to.
+    :param local_path str: Local path to the file to transfer.
+    :param remote_path str: Destination path on the devices.
+    :returns list: For each device, None if the transfer succeeded, or the
+    exception raised if it failed.
+    """
+    return await asyncio.gather(
+        *(_put(dev, local_path, remote_path) for dev in devices),
+        return_exceptions=True
+    )
+
+
+async def _put(device, local_path, remote_path):
+    async with await _connect(device) as conn:
+        async with conn.start_sftp_client() as sftp:
+            await sftp.put(local_path, remote_path)
+
+
+async def _connect(device, retry_limit=3, retry_interval_s=5):
+    """Connect to device, retrying as SSHSession does.
+
+    The wait between attempts doesn't block the event loop, so connections
+    to the other devices carry on in the meantime.
+    """
+    options = dict(
+        username=device.username,
+        password=device.password if device.password else None,
+        # Accept unknown host keys, as SSHSession does.
+        known_hosts=None,
+    )
+    # Passing client_keys=None would disable public key auth altogether, so
+    # only pass the keys when there are some. Otherwise asyncssh uses the
+    # default keys and the ssh agent, as paramiko does.
+    key_filename = ssh.lookup_key_filename(device.hostname)
+    if key_filename:
+        options["client_keys"] = key_filename
+    for attempt in range(retry_limit):
+        try:
+            return await asyncssh.connect(device.address, **options)
+        # Banner and login timeouts are raised as asyncio.TimeoutError.
+        except (asyncssh.Error, asyncio.TimeoutError) as ssh_error:
+            if attempt == retry_limit - 1:
+                raise IOError(
+                    "Failed to connect to {}, the error was: {}".format(
+                        device.address, ssh_error
+                    )
+                )
+            await asyncio.sleep(ssh.retry_delay(attempt, retry_interval_s))
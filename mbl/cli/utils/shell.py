@@ -6,8 +6,8 @@
 """SSH shell module."""
 
 import functools
-import select
-import struct
+import os
+import selectors
 import shutil
 import subprocess
 import sys
@@ -16,26 +16,41 @@ from abc import abstractmethod
 
 from paramiko.ssh_exception import SSHException
 
+# termios/tty are only available on mac & Linux
+if sys.platform != "win32":
+    import termios
+    import tty
+
 # Maximum number of bytes to read from the ssh channel.
-MAX_READ_BYTES = 1024
+MAX_READ_BYTES = 65536
+
+# Maximum number of bytes to read from stdin.
+MAX_STDIN_BYTES = 4096
 
 
 class ShellTerminate(Exception):
     """SSH data transfer has stopped."""
 
 
+def _write_to_stdout(data):
+    """Write bytes received from the ssh channel to stdout.
+
+    The bytes are passed to the terminal as they are, rather than being
+    decoded first. This avoids decoding every chunk, and multi-byte
+    characters split across two chunks are no longer dropped.
+    """
+    sys.stdout.buffer.write(data)
+    sys.stdout.buffer.flush()
+
+
 def termios_tty(func):
     """Create a tty using termios.
 
-    Use as a decorator.
+    Use as a decorator. On Windows, where there's no termios, the function is
+    returned undecorated.
     """
-    # termios/tty imports are only available on mac & Linux
-    try:
-        import termios
-        import tty
-        import fcntl
-    except ImportError:
-        return
+    if sys.platform == "win32":
+        return func
 
     @functools.wraps(func)
     def wrapper(self, *args, **kwargs):
@@ -43,8 +58,7 @@ def termios_tty(func):
         try:
             tty.setraw(sys.stdin.fileno())
             tty.setcbreak(sys.stdin.fileno())
-            self.chan.settimeout(0.0)
-            func(self, termios, fcntl, **kwargs)
+            func(self, *args, **kwargs)
         finally:
             termios.tcsetattr(sys.stdin, termios.TCSADRAIN, oldtty)
 
@@ -71,31 +85,42 @@ class PosixSSHShell(SSHShell):
     For macOS & Linux.
     """
 
+    def __init__(self, channel):
+        """:param channel Channel: ssh channel that connects to the shell."""
+        # Register the channel and stdin once, rather than passing them to
+        # select on every iteration of the IO loop.
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(channel, selectors.EVENT_READ)
+        self._selector.register(sys.stdin, selectors.EVENT_READ)
+        super().__init__(channel)
+
     @termios_tty
-    def run(self, termios_, fcntl_):
+    def run(self):
         """Terminal IO."""
-        while not self.chan.closed:
-            rlist, wlist, elist = select.select([self.chan, sys.stdin], [], [])
-            buffer_size = self._get_chan_buffer_size(fcntl_, termios_, rlist)
-            self._set_tty_size()
-            try:
-                if self.chan in rlist:
-                    self._write_chan_to_stdout()
-                if sys.stdin in rlist:
-                    self._write_stdin_to_chan(buffer_size)
-            except ShellTerminate:
-                print("\r\nShell terminated.", end="\r\n")
-                break
+        try:
+            while not self.chan.closed:
+                rlist = [key.fileobj for key, _ in self._selector.select()]
+                self._set_tty_size()
+                try:
+                    if self.chan in rlist:
+                        self._write_chan_to_stdout()
+                    if sys.stdin in rlist:
+                        self._write_stdin_to_chan()
+                except ShellTerminate:
+                    print("\r\nShell terminated.", end="\r\n")
+                    break
+        finally:
+            self._selector.close()
 
     def _write_chan_to_stdout(self):
-        try:
-            chan_input = self.chan.recv(MAX_READ_BYTES).decode()
-        except UnicodeDecodeError:
-            return
+        # The channel is left blocking. The selector only reports it as
+        # readable when there's data to receive, or at EOF, when recv
+        # returns no data. So this never blocks, and a non-blocking recv
+        # would only add the cost of raising socket.timeout on an empty read.
+        chan_input = self.chan.recv(MAX_READ_BYTES)
         if not chan_input:
             raise ShellTerminate()
-        sys.stdout.write(chan_input)
-        sys.stdout.flush()
+        _write_to_stdout(chan_input)
 
     def _set_tty_size(self):
         term_size = shutil.get_terminal_size()
@@ -106,18 +131,19 @@ class PosixSSHShell(SSHShell):
         except SSHException:
             return
 
-    def _write_stdin_to_chan(self, buffer_size):
-        stdin = sys.stdin.read(buffer_size)
+    def _write_stdin_to_chan(self):
+        # Read whatever is available, up to MAX_STDIN_BYTES, directly from
+        # the stdin fd. A paste is sent in one packet rather than a byte at a
+        # time, and nothing is left in sys.stdin's buffer where the selector
+        # can't see it.
+        stdin = os.read(sys.stdin.fileno(), MAX_STDIN_BYTES)
         if not stdin:
             raise ShellTerminate()
-        num_bytes = self.chan.send(stdin)
-        if not num_bytes:
+        try:
+            self.chan.sendall(stdin)
+        except OSError:
             raise ShellTerminate()
 
-    def _get_chan_buffer_size(self, fcntl_, termios_, rlist):
-        buffered_raw = fcntl_.ioctl(rlist[0].fileno(), termios_.FIONREAD, "  ")
-        return struct.unpack("h", buffered_raw)[0]
-
 
 class WindowsSSHShell(SSHShell):
     """Windows terminal IO."""
@@ -128,15 +154,14 @@ class WindowsSSHShell(SSHShell):
 
         def write_to_stdout(channel):
             while True:
-                data = channel.recv(MAX_READ_BYTES).decode()
+                data = channel.recv(MAX_READ_BYTES)
                 if not data:
                     sys.stdout.write(
                         "\r\nShell terminated. Press Enter to quit.\r\n"
                     )
                     break
                 else:
-                    sys.stdout.write(data)
-                    sys.stdout.flush()
+                    _write_to_stdout(data)
 
         write_task = threading.Thread(
             target=write_to_stdout, args=(self.chan,)
@@ -144,11 +169,13 @@ class WindowsSSHShell(SSHShell):
         write_task.start()
         try:
             while True:
-                stdin_data = sys.stdin.read(1)
+                # read1 returns as soon as any input is available, so input
+                # is sent in one packet rather than a character at a time.
+                stdin_data = sys.stdin.buffer.read1(MAX_STDIN_BYTES)
                 if not stdin_data:
                     write_task.join()
                     raise EOFError()
                 else:
-                    self.chan.send(stdin_data)
+                    self.chan.sendall(stdin_data)
         except EOFError:
             pass
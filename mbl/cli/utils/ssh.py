@@ -6,10 +6,20 @@
 """Handle ssh connections and data transfer."""
 
 
+import atexit
+import concurrent.futures
+import contextlib
 import functools
 import logging
+import mmap
+import os
 import pathlib
 import platform
+import posixpath
+import random
+import socket
+import stat
+import sys
 import time
 
 import paramiko
@@ -21,26 +31,95 @@ logging.getLogger("paramiko").setLevel(logging.CRITICAL)
 
 SUPPRESS_PROGRESS = False
 
+# Interval between keepalive packets sent on idle connections.
+KEEPALIVE_INTERVAL_S = 30
+
+# Maximum time to wait between connection attempts, excluding jitter.
+MAX_RETRY_INTERVAL_S = 30
+
+# Maximum number of bytes of a failed remote command's stderr to include in
+# the SSHCallError message.
+MAX_ERROR_MSG_BYTES = 4096
+
+# Maximum number of bytes of a remote command's output to read at once.
+MAX_CMD_READ_BYTES = 65536
+
+# Connected SSH clients, keyed by (address, username, identityfile).
+_POOL = dict()
+
+# The scp send buffer size and the SSH channel window/packet sizes used for
+# file transfers. The scp and paramiko defaults (16KiB buffer, ~2MiB window)
+# limit throughput far below the link speed, as the sender stalls waiting for
+# window adjustments from the remote end.
+SCP_BUFF_SIZE = 1024 * 1024
+SSH_WINDOW_SIZE = 2 ** 27
+SSH_MAX_PACKET_SIZE = 2 ** 19
+
+# Size of the SFTP write requests used for whole file uploads. OpenSSH's
+# sftp-server rejects any message larger than 256KiB, so the request size
+# leaves room for the message header.
+SFTP_MAX_REQUEST_SIZE = 255 * 1024
+
+# Size of the SFTP read requests used for downloads, and of the reads from the
+# remote file. Older OpenSSH sftp-servers return at most 64KiB per read
+# request, and paramiko stops prefetching after a short read, so the read
+# requests can't be as large as the write requests.
+SFTP_MAX_READ_REQUEST_SIZE = 64 * 1024
+SFTP_READ_SIZE = 1024 * 1024
+
+# Files at least this large are memory mapped for whole file uploads, rather
+# than read into memory. Whole file uploads are written in slices of
+# SFTP_WRITE_SIZE bytes, so the transfer progress can be displayed.
+SFTP_MMAP_THRESHOLD = 64 * 1024 * 1024
+SFTP_WRITE_SIZE = 16 * 1024 * 1024
+
+# Minimum number of bytes transferred and seconds elapsed between updates
+# of the scp progress display.
+PROGRESS_MIN_BYTES = 1024 * 1024
+PROGRESS_INTERVAL_S = 0.2
+
+# The progress line starts with the vt100 escape sequence to clear the
+# current line.
+# http://ascii-table.com/ansi-escape-sequences-vt-100.php
+# This will not work on a Windows cmd line, as it doesn't
+# have vt100 support by default.
+# TODO: Windows solution.
+_PROGRESS_TEMPLATE = "\r\x1b[2K{} is transferring. Progress {:2.1%}\r"
+
+# Time and byte count of the last progress display update.
+_last_update = 0.0
+_last_sent = 0
+
 
 def scp_progress(filename, size, sent):
-    """Display the progress of an scp transfer."""
-    if sent and not SUPPRESS_PROGRESS:
-        try:
-            fname = filename.decode()
-        except AttributeError:
-            fname = filename
-        print(
-            "\r{} is transferring. Progress {:2.1%}".format(
-                fname, sent / size
-            ),
-            end="\r",
-        )
-        # vt100 escape sequence to clear current line
-        # http://ascii-table.com/ansi-escape-sequences-vt-100.php
-        # this will not work on a Windows cmd line, as it doesn't
-        # have vt100 support by default.
-        # TODO: Windows solution.
-        print("\x1b[2K", end="")
+    """Display the progress of an scp transfer.
+
+    The SCPClient calls this for every chunk it transfers, and the transfer
+    blocks while we write to the terminal. Updates are therefore only shown
+    once at least PROGRESS_MIN_BYTES have been sent and PROGRESS_INTERVAL_S
+    has passed since the last update, or when the file transfer completes.
+    """
+    global _last_update, _last_sent
+    if not sent:
+        # A new file transfer has started.
+        _last_sent = 0
+        return
+    if sent < size:
+        if sent - _last_sent < PROGRESS_MIN_BYTES:
+            return
+        now = time.monotonic()
+        if now - _last_update < PROGRESS_INTERVAL_S:
+            return
+        _last_update = now
+        _last_sent = sent
+    else:
+        _last_sent = 0
+    try:
+        fname = filename.decode()
+    except AttributeError:
+        fname = filename
+    sys.stdout.write(_PROGRESS_TEMPLATE.format(fname, sent / size))
+    sys.stdout.flush()
 
 
 def _scp_session(transfer_func):
@@ -53,8 +132,11 @@ def _scp_session(transfer_func):
     # retain metadata from the wrapped function 'object'.
     @functools.wraps(transfer_func)
     def wrapper(self, local_path, remote_path, recursive=False):
-        with scp.SCPClient(
-            self._client.get_transport(), progress=scp_progress
+        transport = self._client.get_transport()
+        with _tuned_transport(transport), scp.SCPClient(
+            transport,
+            buff_size=SCP_BUFF_SIZE,
+            progress=None if SUPPRESS_PROGRESS else scp_progress,
         ) as scp_client:
             transfer_func(
                 self,
@@ -67,6 +149,259 @@ def _scp_session(transfer_func):
     return wrapper
 
 
+@contextlib.contextmanager
+def _tuned_transport(transport):
+    """Set the window and packet sizes used for transfers on transport.
+
+    The sizes are applied to channels opened in the context, which includes
+    the channels opened by SCPClients. The previous sizes are restored when
+    the context exits, as the transport may be pooled, and the shell and
+    command channels opened on it later don't need the large window.
+    """
+    defaults = (
+        transport.default_window_size,
+        transport.default_max_packet_size,
+    )
+    transport.default_window_size = SSH_WINDOW_SIZE
+    transport.default_max_packet_size = SSH_MAX_PACKET_SIZE
+    try:
+        yield transport
+    finally:
+        (
+            transport.default_window_size,
+            transport.default_max_packet_size,
+        ) = defaults
+
+
+def _sftp_session(transfer_func):
+    """Start an sftp session on the client.
+
+    The session's channel is opened with the tuned window and packet sizes.
+    Teardown the SFTP session when the SFTPClient context manager exits.
+
+    This decorator can only be used with methods of the SSHSession class.
+    """
+    # retain metadata from the wrapped function 'object'.
+    @functools.wraps(transfer_func)
+    def wrapper(self, local_path, remote_path, **kwargs):
+        try:
+            sftp_client = paramiko.SFTPClient.from_transport(
+                self._client.get_transport(),
+                window_size=SSH_WINDOW_SIZE,
+                max_packet_size=SSH_MAX_PACKET_SIZE,
+            )
+        except paramiko.SSHException as ssh_error:
+            raise SFTPUnavailableError(
+                "Failed to start an sftp session, the error was: {}".format(
+                    ssh_error
+                )
+            )
+        with sftp_client:
+            transfer_func(
+                self,
+                local_path=local_path,
+                remote_path=remote_path,
+                sftp_client=sftp_client,
+                **kwargs
+            )
+
+    return wrapper
+
+
+def _sftp_progress(filename):
+    """Return an sftp transfer progress callback for filename.
+
+    Return None when progress output is suppressed.
+    """
+    if SUPPRESS_PROGRESS:
+        return None
+    return lambda sent, size: scp_progress(filename, size, sent)
+
+
+def _remote_target_path(sftp_client, remote_path, filename):
+    """Return the remote file path for a transfer to remote_path.
+
+    Unlike scp, sftp needs the full destination file path, so if remote_path
+    is a directory the filename is appended to it.
+    """
+    try:
+        is_dir = stat.S_ISDIR(sftp_client.stat(remote_path).st_mode)
+    except IOError:
+        is_dir = False
+    return posixpath.join(remote_path, filename) if is_dir else remote_path
+
+
+def _remote_mkdir(sftp_client, path):
+    """Create a remote directory, unless it already exists.
+
+    :returns bool: True if the directory was created.
+    """
+    try:
+        sftp_client.mkdir(path)
+    except IOError:
+        if not stat.S_ISDIR(sftp_client.stat(path).st_mode):
+            raise
+        return False
+    return True
+
+
+def _copy_mode(sftp_client, local_path, remote_path):
+    """Set the mode of remote_path to the mode of local_path.
+
+    Files created over sftp get the server's default mode, whereas scp keeps
+    the mode of the source file.
+    """
+    sftp_client.chmod(remote_path, stat.S_IMODE(os.stat(local_path).st_mode))
+
+
+def _put_file(sftp_client, local_path, remote_path):
+    """Send the file at local_path via sftp, as in SSHSession.put_sftp."""
+    filename = os.path.basename(local_path)
+    remote_path = _remote_target_path(sftp_client, remote_path, filename)
+    size = os.path.getsize(local_path)
+    progress = _sftp_progress(filename)
+    if size >= SFTP_MMAP_THRESHOLD:
+        _put_whole_file(sftp_client, local_path, remote_path, progress)
+        return
+
+    sent = 0
+
+    # putfo doesn't return the number of bytes sent when confirm is off,
+    # so record it from the transfer callback.
+    def callback(bytes_so_far, total):
+        nonlocal sent
+        sent = bytes_so_far
+        if progress:
+            progress(bytes_so_far, total)
+
+    with open(local_path, "rb") as local_file:
+        sftp_client.putfo(
+            local_file,
+            remote_path,
+            file_size=size,
+            callback=callback,
+            confirm=False,
+        )
+    _check_sent_size(local_path, size, sent)
+    _copy_mode(sftp_client, local_path, remote_path)
+
+
+def _put_whole_file(sftp_client, local_path, remote_path, progress):
+    """Write the contents of local_path to remote_path."""
+    size = os.path.getsize(local_path)
+    with open(local_path, "rb") as local_file:
+        if size < SFTP_MMAP_THRESHOLD:
+            sent = _write_remote_file(
+                sftp_client, remote_path, local_file.read(), progress
+            )
+        else:
+            with mmap.mmap(
+                local_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as data:
+                sent = _write_remote_file(
+                    sftp_client, remote_path, data, progress
+                )
+    _check_sent_size(local_path, size, sent)
+    _copy_mode(sftp_client, local_path, remote_path)
+
+
+def _write_remote_file(sftp_client, remote_path, data, progress):
+    """Write a bytes-like object to remote_path.
+
+    :returns int: the number of bytes written.
+    """
+    # Open the file unbuffered, so the data isn't copied to a write buffer.
+    with sftp_client.open(remote_path, "wb", bufsize=0) as remote_file:
+        remote_file.MAX_REQUEST_SIZE = SFTP_MAX_REQUEST_SIZE
+        remote_file.set_pipelined(True)
+        with memoryview(data) as view:
+            size = len(view)
+            for offset in range(0, size, SFTP_WRITE_SIZE):
+                remote_file.write(view[offset : offset + SFTP_WRITE_SIZE])
+                if progress:
+                    progress(min(offset + SFTP_WRITE_SIZE, size), size)
+    return size
+
+
+def _check_sent_size(local_path, expected, sent):
+    """Raise if the number of bytes sent isn't the size of the local file.
+
+    Checking locally avoids stat'ing the remote file after the transfer,
+    which is an extra round trip for every file.
+    """
+    if sent != expected:
+        raise IOError(
+            "Transfer of {} failed, {} of {} bytes were sent.".format(
+                local_path, sent, expected
+            )
+        )
+
+
+@functools.lru_cache(maxsize=1)
+def _parse_ssh_config():
+    """Parse ~/.ssh/config once, return None if it doesn't exist."""
+    conf_path = pathlib.Path().home() / ".ssh" / "config"
+    if not conf_path.exists():
+        return None
+    config = paramiko.SSHConfig()
+    with conf_path.open() as conf_file:
+        config.parse(conf_file)
+    return config
+
+
+@functools.lru_cache(maxsize=None)
+def lookup_key_filename(hostname):
+    """Look up the identity file for hostname in ~/.ssh/config.
+
+    The config file is only parsed and matched against hostname once.
+
+    :param hostname str: The hostname specified in ~/.ssh/config.
+    :returns tuple: identity file paths, or None if there are none.
+    """
+    config = _parse_ssh_config()
+    if config is None:
+        return None
+    key_filename = config.lookup(hostname).get("identityfile")
+    return tuple(key_filename) if key_filename else None
+
+
+def retry_delay(attempt, retry_interval_s):
+    """Return the time to wait before retrying a failed connection.
+
+    The delay grows exponentially with each attempt, up to
+    MAX_RETRY_INTERVAL_S. Random jitter is added so that connections to a
+    batch of devices don't retry in lockstep.
+
+    :param attempt int: The number of the failed attempt, starting at 0.
+    :param retry_interval_s float: The delay after the first attempt.
+    """
+    return min(
+        retry_interval_s * 2 ** attempt, MAX_RETRY_INTERVAL_S
+    ) + random.uniform(0, 1)
+
+
+def _read_tail(file_obj, size):
+    """Read file_obj to EOF, return at most the last `size` bytes."""
+    tail = b""
+    for buf in iter(functools.partial(file_obj.read, MAX_CMD_READ_BYTES), b""):
+        tail = (tail + buf)[-size:]
+    return tail
+
+
+def _is_active(client):
+    """Check the client's transport is still connected."""
+    transport = client.get_transport()
+    return transport is not None and transport.is_active()
+
+
+@atexit.register
+def _shutdown_pool():
+    """Close all pooled ssh clients."""
+    while _POOL:
+        _, client = _POOL.popitem()
+        client.close()
+
+
 class SSHClientWithNoAuthSupport(paramiko.SSHClient):
     """SSH Client which handles 'no auth' SSH devices."""
 
@@ -79,24 +414,69 @@ class SSHClientWithNoAuthSupport(paramiko.SSHClient):
 
 
 class SSHSession:
-    """Context manager wrapping an SSHClient, handles setup/auth and scp."""
+    """Context manager wrapping an SSHClient, handles setup/auth and scp.
+
+    Connected clients are returned to a pool when the context exits, so
+    subsequent sessions with the same device reuse the connection rather
+    than repeating the SSH handshake.
+
+    A pooled connection stays open until shutdown_pool is called, or the
+    interpreter exits. The CLI shuts the pool down once each command has
+    completed, so an action can open as many sessions as it needs without
+    reconnecting, but connections aren't held open for the next command.
+    """
 
     def __init__(self, device):
         """:param device DeviceInfo: A device info object."""
         self.device = device
-        self._client = SSHClientWithNoAuthSupport()
-        self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._client = None
+        self._key_filename = None
 
     def __enter__(self):
-        """Enter the context, connect to the ssh session."""
-        self._connect()
+        """Enter the context, connect to the ssh session.
+
+        An active pooled connection to the device is used if there is one.
+        """
+        self._key_filename = lookup_key_filename(self.device.hostname)
+        client = _POOL.pop(self._pool_key, None)
+        if client is not None and _is_active(client):
+            self._client = client
+        else:
+            if client is not None:
+                client.close()
+            self._client = SSHClientWithNoAuthSupport()
+            self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            try:
+                self._connect()
+            except Exception:
+                # __exit__ isn't called when __enter__ raises.
+                self._client.close()
+                raise
         return self
 
     def __exit__(self, *exception_info):
-        """Exit the context, ensuring the ssh client is closed."""
-        self._client.close()
+        """Exit the context, returning the ssh client to the pool."""
+        if self._pool_key in _POOL:
+            # A nested session with the same device already returned its
+            # client to the pool.
+            self._client.close()
+        else:
+            _POOL[self._pool_key] = self._client
         return False
 
+    @staticmethod
+    def shutdown_pool():
+        """Close all pooled ssh clients."""
+        _shutdown_pool()
+
+    @property
+    def _pool_key(self):
+        return (
+            self.device.address,
+            self.device.username,
+            self._key_filename,
+        )
+
     @_scp_session
     def put(self, local_path, remote_path, recursive, scp_client=None):
         """Send data via scp."""
@@ -109,6 +489,142 @@ class SSHSession:
         """Get data via scp."""
         scp_client.get(remote_path, local_path, recursive=recursive)
 
+    @_sftp_session
+    def put_sftp(self, local_path, remote_path, sftp_client=None):
+        """Send a file via sftp.
+
+        The sftp writes are pipelined, so unlike scp the transfer doesn't
+        wait for an acknowledgement of each chunk.
+        Files of at least SFTP_MMAP_THRESHOLD bytes are sent as in put_large.
+        """
+        _put_file(sftp_client, local_path, remote_path)
+
+    def put_tree(self, local_path, remote_path, workers=4):
+        """Send a directory tree, transferring the files in parallel.
+
+        As with a recursive scp, if remote_path is an existing directory
+        local_path is copied into it, otherwise it's copied to remote_path.
+        The remote directories are created over sftp, then the files are
+        sent via scp by a pool of `workers` threads. Each file has its own
+        channel on the shared transport.
+
+        If the device doesn't support sftp the tree is sent by a recursive
+        scp put instead.
+        """
+        try:
+            self._put_tree(
+                local_path=local_path,
+                remote_path=remote_path,
+                workers=workers,
+            )
+        except SFTPUnavailableError:
+            self.put(local_path, remote_path, recursive=True)
+
+    @_sftp_session
+    def _put_tree(self, local_path, remote_path, workers, sftp_client=None):
+        if not os.path.isdir(local_path):
+            if not os.path.exists(local_path):
+                raise FileNotFoundError(
+                    "{} does not exist.".format(local_path)
+                )
+            # As with a recursive scp, a single file is just sent.
+            _put_file(sftp_client, local_path, remote_path)
+            return
+        dirname = os.path.basename(os.path.normpath(local_path))
+        remote_root = _remote_target_path(sftp_client, remote_path, dirname)
+        files = []
+        created_dirs = []
+        for dirpath, _, filenames in os.walk(local_path):
+            rel_dirpath = os.path.relpath(dirpath, local_path)
+            remote_dirpath = posixpath.normpath(
+                posixpath.join(remote_root, *rel_dirpath.split(os.sep))
+            )
+            if _remote_mkdir(sftp_client, remote_dirpath):
+                created_dirs.append((dirpath, remote_dirpath))
+            files.extend(
+                (
+                    os.path.join(dirpath, fname),
+                    posixpath.join(remote_dirpath, fname),
+                )
+                for fname in filenames
+            )
+
+        transport = self._client.get_transport()
+
+        def put_file(local_file, remote_file):
+            with scp.SCPClient(
+                transport, buff_size=SCP_BUFF_SIZE
+            ) as scp_client:
+                scp_client.put(local_file, remote_path=remote_file)
+            return os.path.getsize(local_file)
+
+        # Display the progress of the whole tree as the files complete.
+        total_size = sum(os.path.getsize(local) for local, _ in files)
+        sent = 0
+        with _tuned_transport(transport):
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                futures = [
+                    executor.submit(put_file, *paths) for paths in files
+                ]
+                for future in concurrent.futures.as_completed(futures):
+                    sent += future.result()
+                    if not SUPPRESS_PROGRESS:
+                        scp_progress(dirname, total_size, sent)
+
+        # As scp does, give the directories we created the modes of the local
+        # directories, once the files are in place. A read-only directory
+        # could not be written to if it were set first. Existing directories
+        # keep their modes.
+        for local_dirpath, remote_dirpath in created_dirs:
+            _copy_mode(sftp_client, local_dirpath, remote_dirpath)
+
+    @_sftp_session
+    def put_large(self, local_path, remote_path, sftp_client=None):
+        """Send a whole file via sftp in as few write calls as possible.
+
+        putfo copies the file in 32KiB reads and writes. Here the file is
+        memory mapped (or, below SFTP_MMAP_THRESHOLD bytes, read into memory)
+        and written in large slices, which paramiko splits into pipelined
+        SFTP_MAX_REQUEST_SIZE requests.
+        """
+        filename = os.path.basename(local_path)
+        _put_whole_file(
+            sftp_client,
+            local_path,
+            _remote_target_path(sftp_client, remote_path, filename),
+            _sftp_progress(filename),
+        )
+
+    @_sftp_session
+    def get_sftp(self, remote_path, local_path, sftp_client=None):
+        """Get a file via sftp.
+
+        The remote file is prefetched, which keeps multiple read requests in
+        flight while we copy the data to the local file. As with scp, the
+        local file is given the mode of the remote file.
+        """
+        if os.path.isdir(local_path):
+            local_path = os.path.join(
+                local_path, posixpath.basename(remote_path)
+            )
+        progress = _sftp_progress(posixpath.basename(remote_path))
+        with sftp_client.open(remote_path, "rb") as remote_file:
+            remote_file.MAX_REQUEST_SIZE = SFTP_MAX_READ_REQUEST_SIZE
+            remote_stat = remote_file.stat()
+            size = remote_stat.st_size
+            remote_file.prefetch(size)
+            with open(local_path, "wb") as local_file:
+                received = 0
+                while True:
+                    data = remote_file.read(SFTP_READ_SIZE)
+                    if not data:
+                        break
+                    local_file.write(data)
+                    received += len(data)
+                    if progress:
+                        progress(received, size)
+        os.chmod(local_path, stat.S_IMODE(remote_stat.st_mode))
+
     def start_shell(self):
         """Start an interactive shell."""
         if platform.system() == "Windows":
@@ -127,22 +643,32 @@ class SSHSession:
         # exception raising if the remote command's exit code is non-zero.
         def _check_print_out(ssh_chan_output, check, writeout):
             if writeout:
-                for out_fd in ssh_chan_output:
-                    while out_fd.readable():
-                        buf = out_fd.readline()
-                        if not buf:
-                            break
-                        print(buf, end="")
+                chan = ssh_chan_output[1].channel
+                # Copy the remote stdout then stderr in large chunks,
+                # straight from the channel. recv returns as soon as any data
+                # is available, so the output is still streamed.
+                sys.stdout.flush()
+                for recv in (chan.recv, chan.recv_stderr):
+                    for buf in iter(
+                        functools.partial(recv, MAX_CMD_READ_BYTES), b""
+                    ):
+                        sys.stdout.buffer.write(buf)
+                        sys.stdout.buffer.flush()
 
             if check:
                 _, stdout, stderr = ssh_chan_output
                 exit_status = stdout.channel.recv_exit_status()
                 if exit_status != 0:
                     msg = "Remote command returned a non-zero exit code."
-                    if stderr.readable():
-                        buf = stderr.read().decode()
-                        if buf:
-                            msg = "{}".format(buf)
+                    # Only the end of the stderr is needed for the message.
+                    # Replace undecodable bytes rather than failing, as a
+                    # tool's output isn't necessarily UTF-8 and the tail may
+                    # start part way through a character.
+                    buf = _read_tail(stderr, MAX_ERROR_MSG_BYTES).decode(
+                        "utf-8", errors="replace"
+                    )
+                    if buf:
+                        msg = "{}".format(buf)
                     raise SSHCallError(msg, code=exit_status)
 
         try:
@@ -157,21 +683,12 @@ class SSHSession:
             return cmd_output
 
     def _connect(self, retry_limit=3, retry_interval_s=5):
-        config = paramiko.SSHConfig()
-        conf_path = pathlib.Path().home() / ".ssh" / "config"
-
-        if conf_path.exists():
-            config.parse(conf_path.open())
-            cdict = config.lookup(self.device.hostname)
-        else:
-            cdict = None
-
         # There are often "SSH Protocol Banner" timeouts while waiting for the
         # server to present us with its SSH protocol banner.
         # We set paramiko's `banner_timeout` parameter, but that rarely solves
         # the problem. Therefore we retry the connection `retry_limit` times
         # to try and decrease the rate of failure.
-        for _ in range(retry_limit):
+        for attempt in range(retry_limit):
             try:
                 self._client.connect(
                     self.device.address,
@@ -179,20 +696,45 @@ class SSHSession:
                     password=self.device.password
                     if self.device.password
                     else None,
-                    key_filename=cdict["identityfile"] if cdict else None,
+                    key_filename=self._key_filename,
                     banner_timeout=60,
                 )
-            except paramiko.SSHException:
-                time.sleep(retry_interval_s)
-                continue
+            except paramiko.SSHException as ssh_error:
+                if attempt == retry_limit - 1:
+                    raise IOError(
+                        "Failed to connect to {}, the error was: {}".format(
+                            self.device.address, ssh_error
+                        )
+                    )
+                time.sleep(retry_delay(attempt, retry_interval_s))
             else:
+                self._configure_transport()
                 break
 
+    def _configure_transport(self):
+        """Set up the connected transport for interactive use.
+
+        Disable Nagle's algorithm, so keystrokes and short commands aren't
+        delayed waiting for an ACK. Send keepalives so idle pooled
+        connections aren't dropped.
+        """
+        transport = self._client.get_transport()
+        transport.set_keepalive(KEEPALIVE_INTERVAL_S)
+        sock = transport.sock
+        # The transport may be running over a ProxyCommand rather than a
+        # TCP socket.
+        if isinstance(sock, socket.socket):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
 
 class SCPValidationFailed(Exception):
     """SCP transfer md5 validation failed."""
 
 
+class SFTPUnavailableError(IOError):
+    """The device doesn't support sftp."""
+
+
 class SSHCallError(Exception):
     """SSH remote command failed."""
 
@@ -37,6 +37,7 @@ setup(
         "Programming Language :: Python :: 3.7",
     ],
     install_requires=readlines("requirements.txt"),
+    extras_require={"async": ["asyncssh"]},
     include_package_data=True,
     zip_safe=False,
     entry_points={"console_scripts": ["mbl-cli = mbl.cli.mbl_cli:_main"]},
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# Copyright (c) 2019 Arm Limited and Contributors. All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Tests for the async_ssh module."""
+
+import asyncio
+from unittest import mock
+
+import pytest
+
+from mbl.cli.utils import device
+
+asyncssh = pytest.importorskip("asyncssh")
+from mbl.cli.utils import async_ssh  # noqa: E402
+
+
+def run(coro):
+    """Run a coroutine to completion in a new event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class FakeSFTPClient:
+    """Stand-in for an asyncssh SFTPClient."""
+
+    def __init__(self, uploads):
+        self._uploads = uploads
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def put(self, local_path, remote_path):
+        self._uploads.append((local_path, remote_path))
+
+
+class FakeConnection:
+    """Stand-in for an asyncssh SSHClientConnection."""
+
+    def __init__(self, uploads):
+        self._uploads = uploads
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def start_sftp_client(self):
+        return FakeSFTPClient(self._uploads)
+
+
+@pytest.fixture
+def connect():
+    """Mock asyncssh.connect, yield a mock recording the calls made."""
+    calls = mock.Mock()
+    with mock.patch("mbl.cli.utils.async_ssh.asyncssh.connect") as _connect:
+
+        async def fake_connect(*args, **kwargs):
+            return calls(*args, **kwargs)
+
+        _connect.side_effect = fake_connect
+        yield calls
+
+
+@pytest.fixture
+def sleep():
+    """Mock asyncio.sleep in the async_ssh module."""
+    calls = mock.Mock()
+
+    async def fake_sleep(delay):
+        calls(delay)
+
+    with mock.patch(
+        "mbl.cli.utils.async_ssh.asyncio.sleep", side_effect=fake_sleep
+    ):
+        yield calls
+
+
+@pytest.fixture
+def no_keys():
+    """Mock the ssh config lookup to find no identity file."""
+    with mock.patch(
+        "mbl.cli.utils.async_ssh.ssh.lookup_key_filename", return_value=None
+    ) as lookup:
+        yield lookup
+
+
+class TestPutMany:
+    """Concurrent upload tests."""
+
+    def test_failure_is_returned_per_device(self, connect, sleep, no_keys):
+        """Check one device failing doesn't stop the upload to the others."""
+        uploads = []
+
+        def connection(address, **kwargs):
+            if address == "168.254.56.2":
+                raise asyncssh.ConnectionLost("lost")
+            return FakeConnection(uploads)
+
+        connect.side_effect = connection
+        devices = [
+            device.create_device("mbl-1", "168.254.56.1"),
+            device.create_device("mbl-2", "168.254.56.2"),
+            device.create_device("mbl-3", "168.254.56.3"),
+        ]
+        results = run(async_ssh.put_many(devices, "file.bin", "/tmp"))
+        assert results[0] is None
+        assert isinstance(results[1], IOError)
+        assert results[2] is None
+        assert uploads == [("file.bin", "/tmp"), ("file.bin", "/tmp")]
+
+
+class TestConnect:
+    """asyncssh connection tests."""
+
+    def test_raises_after_last_attempt(self, connect, sleep, no_keys):
+        """Check a connection failing every attempt raises."""
+        connect.side_effect = asyncssh.ConnectionLost("lost")
+        dev = device.create_device("mbl-1", "168.254.56.1")
+        with pytest.raises(IOError):
+            run(async_ssh._connect(dev))
+        assert connect.call_count == 3
+        # There's no wait after the last attempt.
+        assert sleep.call_count == 2
+
+    def test_retry_then_connect(self, connect, sleep, no_keys):
+        """Check a connection succeeding after a failure is returned."""
+        conn = mock.Mock()
+        connect.side_effect = [asyncssh.ConnectionLost("lost"), conn]
+        dev = device.create_device("mbl-1", "168.254.56.1")
+        assert run(async_ssh._connect(dev)) is conn
+        assert sleep.call_count == 1
+
+    def test_timeout_is_retried(self, connect, sleep, no_keys):
+        """Check a banner or login timeout is retried."""
+        conn = mock.Mock()
+        connect.side_effect = [asyncio.TimeoutError, conn]
+        dev = device.create_device("mbl-1", "168.254.56.1")
+        assert run(async_ssh._connect(dev)) is conn
+        assert sleep.call_count == 1
+
+    def test_auth_options(self, connect, no_keys):
+        """Check the credentials are passed and unknown hosts accepted."""
+        dev = device.create_device(
+            "mbl-1", "168.254.56.1", username="user", password="pass"
+        )
+        run(async_ssh._connect(dev))
+        connect.assert_called_once_with(
+            "168.254.56.1", username="user", password="pass", known_hosts=None
+        )
+
+    def test_empty_password_is_not_sent(self, connect, no_keys):
+        """Check an empty password is passed as None."""
+        run(async_ssh._connect(device.create_device("mbl-1", "168.254.56.1")))
+        assert connect.call_args[1]["password"] is None
+
+    def test_default_keys_without_identity_file(self, connect, no_keys):
+        """Check client_keys isn't passed without a configured identity."""
+        run(async_ssh._connect(device.create_device("mbl-1", "168.254.56.1")))
+        no_keys.assert_called_once_with("mbl-1")
+        assert "client_keys" not in connect.call_args[1]
+
+    def test_identity_file_is_used(self, connect):
+        """Check the configured identity file is passed as client_keys."""
+        with mock.patch(
+            "mbl.cli.utils.async_ssh.ssh.lookup_key_filename",
+            return_value=("/home/user/.ssh/mbl_key",),
+        ):
+            run(
+                async_ssh._connect(
+                    device.create_device("mbl-1", "168.254.56.1")
+                )
+            )
+        assert connect.call_args[1]["client_keys"] == (
+            "/home/user/.ssh/mbl_key",
+        )
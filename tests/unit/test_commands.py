@@ -17,7 +17,7 @@ from mbl.cli.actions import (
     select_action,
     shell_action,
 )
-from mbl.cli.utils import device
+from mbl.cli.utils import device, ssh
 
 
 @pytest.fixture
@@ -150,11 +150,25 @@ class TestGetCommand:
         _ssh, _scp = mock_ssh
         get_action.execute(args)
         assert _ssh.return_value.__enter__.called
-        _ssh.get.assert_called_once_with(
-            args.src_path, args.dst_path, args.recursive
-        )
+        _ssh.get_sftp.assert_called_once_with(args.src_path, args.dst_path)
+        assert not _ssh.get.called
         assert _ssh.return_value.__exit__.called
 
+    def test_get_falls_back_to_scp(self, mock_ssh, args):
+        """Test a get uses scp when the device doesn't support sftp."""
+        _ssh, _scp = mock_ssh
+        _ssh.get_sftp.side_effect = ssh.SFTPUnavailableError
+        get_action.execute(args)
+        _ssh.get.assert_called_once_with(args.src_path, args.dst_path, False)
+
+    def test_get_recursive_uses_scp(self, mock_ssh, args):
+        """Test a recursive get is transferred using scp."""
+        _ssh, _scp = mock_ssh
+        args.recursive = True
+        get_action.execute(args)
+        _ssh.get.assert_called_once_with(args.src_path, args.dst_path, True)
+        assert not _ssh.get_sftp.called
+
 
 class TestPutCommand:
     """Test the put command."""
@@ -182,11 +196,25 @@ class TestPutCommand:
         _ssh, _scp = mock_ssh
         put_action.execute(args)
         assert _ssh.return_value.__enter__.called
-        _ssh.put.assert_called_once_with(
-            args.src_path, args.dst_path, args.recursive
-        )
+        _ssh.put_sftp.assert_called_once_with(args.src_path, args.dst_path)
+        assert not _ssh.put.called
         assert _ssh.return_value.__exit__.called
 
+    def test_put_falls_back_to_scp(self, mock_ssh, args):
+        """Test a put uses scp when the device doesn't support sftp."""
+        _ssh, _scp = mock_ssh
+        _ssh.put_sftp.side_effect = ssh.SFTPUnavailableError
+        put_action.execute(args)
+        _ssh.put.assert_called_once_with(args.src_path, args.dst_path, False)
+
+    def test_put_recursive_uses_put_tree(self, mock_ssh, args):
+        """Test a recursive put transfers the tree in parallel."""
+        _ssh, _scp = mock_ssh
+        args.recursive = True
+        put_action.execute(args)
+        _ssh.put_tree.assert_called_once_with(args.src_path, args.dst_path)
+        assert not _ssh.put_sftp.called
+
 
 class TestShellCommand:
     """Test shell command."""
@@ -198,6 +226,12 @@ class TestShellCommand:
         _args.address = request.param
         yield _args
 
+    @pytest.fixture(autouse=True)
+    def empty_pool(self):
+        """Don't leave mock clients in the ssh connection pool."""
+        yield
+        ssh.SSHSession.shutdown_pool()
+
     def test_ssh_client_is_called_correctly(self, args):
         with mock.patch(
             "mbl.cli.utils.ssh.SSHClientWithNoAuthSupport", autospec=True
@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+# Copyright (c) 2019 Arm Limited and Contributors. All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+"""Tests for the ssh module."""
+
+import os
+import socket
+import stat
+from unittest import mock
+
+import pytest
+
+from mbl.cli.utils import device, ssh
+
+
+@pytest.fixture
+def dev():
+    """Create a device."""
+    yield device.create_device("mbed-linux-os-9999", "168.254.56.92")
+
+
+@pytest.fixture
+def client():
+    """Mock the ssh client and empty the pool after the test."""
+    with mock.patch(
+        "mbl.cli.utils.ssh.SSHClientWithNoAuthSupport", autospec=True
+    ) as _client:
+        yield _client
+    ssh.SSHSession.shutdown_pool()
+
+
+@pytest.fixture
+def session(dev):
+    """Create a session with a mock ssh client."""
+    _session = ssh.SSHSession(dev)
+    _session._client = mock.create_autospec(ssh.SSHClientWithNoAuthSupport)
+    yield _session
+
+
+@pytest.fixture
+def sftp_client():
+    """Mock the sftp client opened by a session.
+
+    Remote paths don't exist unless a test says otherwise.
+    """
+    with mock.patch(
+        "mbl.cli.utils.ssh.paramiko.SFTPClient.from_transport"
+    ) as from_transport:
+        client = from_transport.return_value
+        client.__enter__.return_value = client
+        client.stat.side_effect = IOError
+        yield client
+
+
+class TestScpProgress:
+    """scp progress display tests."""
+
+    @pytest.fixture(autouse=True)
+    def reset_progress(self):
+        """Reset the progress display state between tests."""
+        ssh._last_update = 0.0
+        ssh._last_sent = 0
+
+    def test_small_increments_are_not_displayed(self, capsys):
+        """Check no update is written for chunks below the byte threshold."""
+        size = ssh.PROGRESS_MIN_BYTES * 4
+        ssh.scp_progress(b"file.bin", size, 0)
+        ssh.scp_progress(b"file.bin", size, ssh.PROGRESS_MIN_BYTES - 1)
+        assert capsys.readouterr().out == ""
+
+    def test_updates_are_rate_limited(self, capsys):
+        """Check a second update within PROGRESS_INTERVAL_S is dropped."""
+        size = ssh.PROGRESS_MIN_BYTES * 4
+        with mock.patch("mbl.cli.utils.ssh.time.monotonic") as monotonic:
+            monotonic.return_value = 100.0
+            ssh.scp_progress(b"file.bin", size, ssh.PROGRESS_MIN_BYTES)
+            ssh.scp_progress(b"file.bin", size, ssh.PROGRESS_MIN_BYTES * 2)
+        assert capsys.readouterr().out.count("is transferring") == 1
+
+    def test_completion_is_always_displayed(self, capsys):
+        """Check the final update is written regardless of the thresholds."""
+        ssh.scp_progress(b"file.bin", 10, 0)
+        ssh.scp_progress(b"file.bin", 10, 10)
+        assert "file.bin is transferring. Progress 100.0%" in (
+            capsys.readouterr().out
+        )
+
+
+class TestScpSession:
+    """scp session setup tests."""
+
+    @pytest.fixture
+    def transport(self, session):
+        """Set paramiko's default window and packet sizes on the transport."""
+        _transport = session._client.get_transport.return_value
+        _transport.default_window_size = 2097152
+        _transport.default_max_packet_size = 32768
+        yield _transport
+
+    @pytest.fixture
+    def scp_client(self, transport):
+        """Mock the SCPClient, record the transport sizes it was opened with.
+
+        The channel is opened by the SCPClient, so the sizes must be tuned
+        before the SCPClient is used.
+        """
+        sizes = []
+        with mock.patch(
+            "mbl.cli.utils.ssh.scp.SCPClient", autospec=True
+        ) as _scp_client:
+            _scp_client.return_value.__enter__.return_value.put.side_effect = (
+                lambda *a, **kw: sizes.append(
+                    (
+                        transport.default_window_size,
+                        transport.default_max_packet_size,
+                    )
+                )
+            )
+            _scp_client.sizes = sizes
+            yield _scp_client
+
+    def test_scp_client_is_tuned(self, session, transport, scp_client):
+        """Check the scp buffer, window and packet sizes are set."""
+        session.put("file.bin", "/tmp/file.bin", recursive=False)
+        scp_client.assert_called_once_with(
+            transport, buff_size=ssh.SCP_BUFF_SIZE, progress=ssh.scp_progress
+        )
+        assert scp_client.sizes == [
+            (ssh.SSH_WINDOW_SIZE, ssh.SSH_MAX_PACKET_SIZE)
+        ]
+
+    def test_progress_is_suppressed(self, session, transport, scp_client):
+        """Check no progress callback is given when progress is suppressed."""
+        with mock.patch("mbl.cli.utils.ssh.SUPPRESS_PROGRESS", True):
+            session.get("/tmp/file.bin", "file.bin", recursive=False)
+        assert scp_client.call_args[1]["progress"] is None
+
+    def test_transport_sizes_are_restored(
+        self, session, transport, scp_client
+    ):
+        """Check the pooled transport's defaults are restored afterwards."""
+        scp_client.return_value.__enter__.return_value.put.side_effect = (
+            ssh.scp.SCPException
+        )
+        with pytest.raises(ssh.scp.SCPException):
+            session.put("file.bin", "/tmp/file.bin", recursive=False)
+        assert transport.default_window_size == 2097152
+        assert transport.default_max_packet_size == 32768
+
+
+class TestConnectionPool:
+    """SSH connection pool tests."""
+
+    def test_active_connection_is_reused(self, client, dev):
+        """Check a second session with the same device doesn't reconnect."""
+        with ssh.SSHSession(dev):
+            pass
+        with ssh.SSHSession(dev):
+            pass
+        client.assert_called_once_with()
+        assert client.return_value.connect.call_count == 1
+        assert not client.return_value.close.called
+
+    def test_inactive_connection_is_replaced(self, client, dev):
+        """Check a dropped pooled connection is closed and re-established."""
+        with ssh.SSHSession(dev):
+            pass
+        transport = client.return_value.get_transport.return_value
+        transport.is_active.return_value = False
+        with ssh.SSHSession(dev):
+            pass
+        assert client.return_value.close.call_count == 1
+        assert client.return_value.connect.call_count == 2
+
+    def test_shutdown_pool_closes_clients(self, client, dev):
+        """Check shutdown_pool closes and removes the pooled clients."""
+        with ssh.SSHSession(dev):
+            pass
+        ssh.SSHSession.shutdown_pool()
+        assert client.return_value.close.called
+        assert not ssh._POOL
+
+
+class TestConnect:
+    """SSH connection retry tests."""
+
+    @pytest.fixture
+    def sleep(self):
+        """Mock time.sleep."""
+        with mock.patch("mbl.cli.utils.ssh.time.sleep") as _sleep:
+            yield _sleep
+
+    def test_raises_after_last_attempt(self, client, sleep, dev):
+        """Check a connection failing every attempt raises."""
+        client.return_value.connect.side_effect = ssh.paramiko.SSHException
+        with pytest.raises(IOError):
+            with ssh.SSHSession(dev):
+                pass
+        assert client.return_value.connect.call_count == 3
+        # There's no wait after the last attempt.
+        assert sleep.call_count == 2
+
+    def test_client_is_closed_when_connect_fails(self, client, sleep, dev):
+        """Check the client isn't leaked or pooled when connecting fails."""
+        client.return_value.connect.side_effect = ssh.paramiko.SSHException
+        with pytest.raises(IOError):
+            with ssh.SSHSession(dev):
+                pass
+        assert client.return_value.close.called
+        assert not ssh._POOL
+
+    @pytest.mark.parametrize("is_socket", [True, False])
+    def test_transport_is_configured(self, client, dev, is_socket):
+        """Check keepalives are set, and Nagle is disabled for TCP sockets."""
+        transport = client.return_value.get_transport.return_value
+        # The transport runs over a ProxyCommand if it's not a socket.
+        transport.sock = mock.Mock(
+            spec=socket.socket if is_socket else ssh.paramiko.ProxyCommand
+        )
+        with ssh.SSHSession(dev):
+            pass
+        transport.set_keepalive.assert_called_once_with(
+            ssh.KEEPALIVE_INTERVAL_S
+        )
+        if is_socket:
+            transport.sock.setsockopt.assert_called_once_with(
+                socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+            )
+        else:
+            assert not transport.sock.mock_calls
+
+    @pytest.mark.parametrize("attempt", [0, 1, 2, 10])
+    def test_retry_delay_backs_off(self, attempt):
+        """Check the retry delay grows exponentially, up to the maximum."""
+        delay = ssh.retry_delay(attempt, 5)
+        expected = min(5 * 2 ** attempt, ssh.MAX_RETRY_INTERVAL_S)
+        assert expected <= delay <= expected + 1
+
+
+class TestRunCmd:
+    """Remote command execution tests."""
+
+    def test_writeout_copies_stdout_and_stderr(self, session, capsys):
+        """Check the remote stdout and stderr are written to stdout."""
+        stdin, stdout, stderr = mock.Mock(), mock.Mock(), mock.Mock()
+        stdout.channel.recv.side_effect = [b"line 1\n", b"line 2\n", b""]
+        stdout.channel.recv_stderr.side_effect = [b"error\n", b""]
+        session._client.exec_command.return_value = (stdin, stdout, stderr)
+        session.run_cmd("ls", writeout=True)
+        assert capsys.readouterr().out == "line 1\nline 2\nerror\n"
+        assert not stdin.mock_calls
+
+    def test_error_message_is_end_of_stderr(self, session):
+        """Check a failed command raises with the end of its stderr."""
+        stdin, stdout, stderr = mock.Mock(), mock.Mock(), mock.Mock()
+        stdout.channel.recv_exit_status.return_value = 2
+        stderr.read.side_effect = [
+            b"x" * ssh.MAX_ERROR_MSG_BYTES,
+            b"\xff failed\n",
+            b"",
+        ]
+        session._client.exec_command.return_value = (stdin, stdout, stderr)
+        with pytest.raises(ssh.SSHCallError) as error:
+            session.run_cmd("false", check=True)
+        assert error.value.return_code == 2
+        msg = str(error.value)
+        assert len(msg) == ssh.MAX_ERROR_MSG_BYTES
+        assert msg.endswith("\ufffd failed\n")
+
+
+class TestLookupKeyFilename:
+    """ssh config identity file lookup tests."""
+
+    @pytest.fixture
+    def ssh_config(self, tmp_path):
+        """Create an ssh config in a temporary home directory."""
+        (tmp_path / ".ssh").mkdir()
+        (tmp_path / ".ssh" / "config").write_text(
+            "Host mbl-device\n    IdentityFile ~/.ssh/mbl_key\n"
+        )
+        ssh._parse_ssh_config.cache_clear()
+        ssh.lookup_key_filename.cache_clear()
+        with mock.patch("pathlib.Path.home", return_value=tmp_path):
+            yield
+        ssh._parse_ssh_config.cache_clear()
+        ssh.lookup_key_filename.cache_clear()
+
+    def test_config_is_parsed_once(self, ssh_config):
+        """Check repeated lookups don't re-parse the ssh config."""
+        with mock.patch.object(
+            ssh.paramiko.SSHConfig, "parse", autospec=True
+        ) as parse:
+            ssh.lookup_key_filename("mbl-device")
+            ssh.lookup_key_filename("other-device")
+            assert parse.call_count == 1
+
+    def test_identity_file_is_found(self, ssh_config):
+        """Check the identity file for a configured host is returned."""
+        key_filename = ssh.lookup_key_filename("mbl-device")
+        assert len(key_filename) == 1
+        assert key_filename[0].endswith("mbl_key")
+
+    def test_host_without_identity_file(self, ssh_config):
+        """Check None is returned for a host with no identity file."""
+        assert ssh.lookup_key_filename("other-device") is None
+
+
+class TestPutSftp:
+    """sftp upload tests."""
+
+    @pytest.fixture
+    def local_file(self, tmp_path):
+        """Create a local file to upload."""
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"x" * 1000)
+        yield str(path)
+
+    def test_upload_is_not_confirmed_remotely(
+        self, session, sftp_client, local_file
+    ):
+        """Check the remote file isn't stat'ed after the upload."""
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](
+            1000, 1000
+        )
+        session.put_sftp(local_path=local_file, remote_path="/tmp/file.bin")
+        assert sftp_client.putfo.call_args[1]["confirm"] is False
+        sftp_client.stat.assert_called_once_with("/tmp/file.bin")
+
+    def test_short_upload_raises(self, session, sftp_client, local_file):
+        """Check an upload which sent fewer bytes than the file raises."""
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](
+            500, 1000
+        )
+        with pytest.raises(IOError):
+            session.put_sftp(
+                local_path=local_file, remote_path="/tmp/file.bin"
+            )
+
+    def test_mode_is_kept(self, session, sftp_client, local_file):
+        """Check the remote file is given the mode of the local file."""
+        os.chmod(local_file, 0o751)
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](
+            1000, 1000
+        )
+        session.put_sftp(local_path=local_file, remote_path="/tmp/file.bin")
+        sftp_client.chmod.assert_called_once_with("/tmp/file.bin", 0o751)
+
+    def test_sftp_unavailable_raises(self, session, local_file):
+        """Check a failure to start the sftp session raises."""
+        with mock.patch(
+            "mbl.cli.utils.ssh.paramiko.SFTPClient.from_transport",
+            side_effect=ssh.paramiko.SSHException,
+        ):
+            with pytest.raises(ssh.SFTPUnavailableError):
+                session.put_sftp(
+                    local_path=local_file, remote_path="/tmp/file.bin"
+                )
+
+
+class TestGetSftp:
+    """sftp download tests."""
+
+    @pytest.fixture
+    def remote_file(self, sftp_client):
+        """Mock a 1000 byte remote file, read in two chunks."""
+        _remote_file = sftp_client.open.return_value.__enter__.return_value
+        _remote_file.stat.return_value = mock.Mock(
+            st_size=1000, st_mode=stat.S_IFREG | 0o751
+        )
+        _remote_file.read.side_effect = [b"a" * 600, b"b" * 400, b""]
+        yield _remote_file
+
+    @pytest.fixture
+    def progress(self):
+        """Mock the sftp progress callback."""
+        callback = mock.Mock()
+        with mock.patch(
+            "mbl.cli.utils.ssh._sftp_progress", return_value=callback
+        ):
+            yield callback
+
+    def test_file_is_copied(self, session, remote_file, progress, tmp_path):
+        """Check the prefetched remote file is written to the local path."""
+        local_path = tmp_path / "copy.bin"
+        session.get_sftp(
+            remote_path="/tmp/file.bin", local_path=str(local_path)
+        )
+        remote_file.prefetch.assert_called_once_with(1000)
+        assert remote_file.MAX_REQUEST_SIZE == ssh.SFTP_MAX_READ_REQUEST_SIZE
+        assert local_path.read_bytes() == b"a" * 600 + b"b" * 400
+        assert progress.call_args_list == [
+            mock.call(600, 1000),
+            mock.call(1000, 1000),
+        ]
+
+    def test_file_is_copied_into_dir(
+        self, session, remote_file, progress, tmp_path
+    ):
+        """Check the remote filename is appended to a local directory."""
+        session.get_sftp(remote_path="/tmp/file.bin", local_path=str(tmp_path))
+        assert (tmp_path / "file.bin").read_bytes() == (
+            b"a" * 600 + b"b" * 400
+        )
+
+    def test_mode_is_kept(self, session, remote_file, progress, tmp_path):
+        """Check the local file is given the mode of the remote file."""
+        local_path = tmp_path / "copy.bin"
+        session.get_sftp(
+            remote_path="/tmp/file.bin", local_path=str(local_path)
+        )
+        assert stat.S_IMODE(local_path.stat().st_mode) == 0o751
+
+
+class TestPutLarge:
+    """Whole file sftp upload tests."""
+
+    @pytest.fixture(params=[False, True], ids=["read", "mmap"])
+    def mmap_threshold(self, request):
+        """Set sizes which send a 1000 byte file in slices, via either path."""
+        threshold = 1000 if request.param else 1001
+        with mock.patch.multiple(
+            "mbl.cli.utils.ssh",
+            SFTP_MMAP_THRESHOLD=threshold,
+            SFTP_WRITE_SIZE=300,
+        ):
+            yield request.param
+
+    @pytest.fixture
+    def local_file(self, tmp_path):
+        """Create a local file to upload, with distinct content per slice."""
+        path = tmp_path / "file.bin"
+        path.write_bytes(bytes(range(250)) * 4)
+        yield path
+
+    @pytest.fixture
+    def remote_writes(self, sftp_client):
+        """Record the data written to the remote file."""
+        writes = []
+        remote_file = sftp_client.open.return_value.__enter__.return_value
+        # Copy the data rather than using a Mock, which would keep the
+        # memoryview slices alive and stop the mmap from being closed.
+        remote_file.write = lambda data: writes.append(bytes(data))
+        yield writes
+
+    @pytest.fixture
+    def progress(self):
+        """Mock the sftp progress callback."""
+        callback = mock.Mock()
+        with mock.patch(
+            "mbl.cli.utils.ssh._sftp_progress", return_value=callback
+        ):
+            yield callback
+
+    def test_file_is_written_in_slices(
+        self,
+        session,
+        sftp_client,
+        mmap_threshold,
+        local_file,
+        remote_writes,
+        progress,
+    ):
+        """Check the file is written in SFTP_WRITE_SIZE slices."""
+        with mock.patch(
+            "mbl.cli.utils.ssh.mmap.mmap", wraps=ssh.mmap.mmap
+        ) as mmap:
+            session.put_large(
+                local_path=str(local_file), remote_path="/tmp/file.bin"
+            )
+        assert mmap.called == mmap_threshold
+        sftp_client.open.assert_called_once_with(
+            "/tmp/file.bin", "wb", bufsize=0
+        )
+        data = local_file.read_bytes()
+        assert remote_writes == [
+            data[0:300],
+            data[300:600],
+            data[600:900],
+            data[900:1000],
+        ]
+        assert progress.call_args_list == [
+            mock.call(300, 1000),
+            mock.call(600, 1000),
+            mock.call(900, 1000),
+            mock.call(1000, 1000),
+        ]
+
+    def test_file_is_sent_into_remote_dir(
+        self, session, sftp_client, local_file, remote_writes, progress
+    ):
+        """Check the filename is appended to an existing remote directory."""
+        sftp_client.stat.side_effect = None
+        sftp_client.stat.return_value = mock.Mock(st_mode=stat.S_IFDIR)
+        session.put_large(local_path=str(local_file), remote_path="/tmp")
+        assert sftp_client.open.call_args[0][0] == "/tmp/file.bin"
+        assert b"".join(remote_writes) == local_file.read_bytes()
+        assert progress.call_args == mock.call(1000, 1000)
+
+    def test_mode_is_kept(
+        self,
+        session,
+        sftp_client,
+        mmap_threshold,
+        local_file,
+        remote_writes,
+        progress,
+    ):
+        """Check the remote file is given the mode of the local file."""
+        local_file.chmod(0o751)
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](
+            1000, 1000
+        )
+        session.put_sftp(
+            local_path=str(local_file), remote_path="/tmp/file.bin"
+        )
+        session.put_large(
+            local_path=str(local_file), remote_path="/tmp/file.bin"
+        )
+        assert sftp_client.chmod.call_args_list == [
+            mock.call("/tmp/file.bin", 0o751),
+            mock.call("/tmp/file.bin", 0o751),
+        ]
+
+    def test_short_write_raises(self, session, sftp_client, local_file):
+        """Check an upload which wrote fewer bytes than the file raises."""
+        with mock.patch(
+            "mbl.cli.utils.ssh._write_remote_file", return_value=500
+        ):
+            with pytest.raises(IOError):
+                session.put_large(
+                    local_path=str(local_file), remote_path="/tmp/file.bin"
+                )
+
+    def test_put_sftp_sends_large_files_whole(
+        self, session, sftp_client, mmap_threshold, local_file, remote_writes
+    ):
+        """Check put_sftp sends files above the mmap threshold as put_large."""
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](
+            1000, 1000
+        )
+        session.put_sftp(
+            local_path=str(local_file), remote_path="/tmp/file.bin"
+        )
+        if mmap_threshold:
+            assert not sftp_client.putfo.called
+            assert b"".join(remote_writes) == local_file.read_bytes()
+        else:
+            assert sftp_client.putfo.called
+            assert not remote_writes
+
+
+class TestPutTree:
+    """Directory tree upload tests."""
+
+    @pytest.fixture
+    def scp_put(self):
+        """Mock the SCPClient, yield its put method."""
+        with mock.patch(
+            "mbl.cli.utils.ssh.scp.SCPClient", autospec=True
+        ) as scp_client:
+            yield scp_client.return_value.__enter__.return_value.put
+
+    @pytest.fixture
+    def local_tree(self, tmp_path):
+        """Create a local directory tree to upload."""
+        tree = tmp_path / "tree"
+        (tree / "sub").mkdir(parents=True)
+        (tree / "a.bin").write_bytes(b"a" * 10)
+        (tree / "sub" / "b.bin").write_bytes(b"b" * 20)
+        yield tree
+
+    def test_tree_is_copied_to_new_path(
+        self, session, sftp_client, scp_put, local_tree
+    ):
+        """Check the tree is copied to a remote path which doesn't exist."""
+        session.put_tree(local_path=str(local_tree), remote_path="/dst")
+        assert sftp_client.mkdir.call_args_list == [
+            mock.call("/dst"),
+            mock.call("/dst/sub"),
+        ]
+        assert sorted(c[1]["remote_path"] for c in scp_put.call_args_list) == [
+            "/dst/a.bin",
+            "/dst/sub/b.bin",
+        ]
+        assert sorted(c[0][0] for c in scp_put.call_args_list) == [
+            str(local_tree / "a.bin"),
+            str(local_tree / "sub" / "b.bin"),
+        ]
+
+    def test_tree_is_copied_into_existing_dir(
+        self, session, sftp_client, scp_put, local_tree
+    ):
+        """Check the tree is copied into an existing remote directory."""
+
+        def remote_stat(path):
+            if path == "/dst":
+                return mock.Mock(st_mode=stat.S_IFDIR)
+            raise IOError
+
+        sftp_client.stat.side_effect = remote_stat
+        session.put_tree(local_path=str(local_tree), remote_path="/dst")
+        assert sftp_client.mkdir.call_args_list == [
+            mock.call("/dst/tree"),
+            mock.call("/dst/tree/sub"),
+        ]
+        assert sorted(c[1]["remote_path"] for c in scp_put.call_args_list) == [
+            "/dst/tree/a.bin",
+            "/dst/tree/sub/b.bin",
+        ]
+
+    def test_scp_channels_are_tuned(
+        self, session, sftp_client, scp_put, local_tree
+    ):
+        """Check the files are sent with the tuned window and packet sizes."""
+        transport = session._client.get_transport.return_value
+        transport.default_window_size = 2097152
+        transport.default_max_packet_size = 32768
+        sizes = []
+        scp_put.side_effect = lambda *a, **kw: sizes.append(
+            (transport.default_window_size, transport.default_max_packet_size)
+        )
+        session.put_tree(local_path=str(local_tree), remote_path="/dst")
+        assert sizes == [(ssh.SSH_WINDOW_SIZE, ssh.SSH_MAX_PACKET_SIZE)] * 2
+        assert transport.default_window_size == 2097152
+        assert transport.default_max_packet_size == 32768
+
+    def test_created_dirs_keep_their_mode(
+        self, session, sftp_client, scp_put, local_tree
+    ):
+        """Check the created remote directories get the local modes."""
+        local_tree.chmod(0o751)
+        (local_tree / "sub").chmod(0o700)
+        session.put_tree(local_path=str(local_tree), remote_path="/dst")
+        assert sftp_client.chmod.call_args_list == [
+            mock.call("/dst", 0o751),
+            mock.call("/dst/sub", 0o700),
+        ]
+
+    def test_existing_dirs_keep_their_mode(
+        self, session, sftp_client, scp_put, local_tree
+    ):
+        """Check the mode of an existing remote directory isn't changed."""
+        sftp_client.mkdir.side_effect = IOError
+        sftp_client.stat.side_effect = None
+        sftp_client.stat.return_value = mock.Mock(st_mode=stat.S_IFDIR)
+        session.put_tree(local_path=str(local_tree), remote_path="/dst")
+        assert not sftp_client.chmod.called
+
+    def test_single_file_is_sent(
+        self, session, sftp_client, scp_put, tmp_path
+    ):
+        """Check a regular file is sent on its own."""
+        local_file = tmp_path / "file.bin"
+        local_file.write_bytes(b"x" * 10)
+        local_file.chmod(0o644)
+        sftp_client.putfo.side_effect = lambda *a, **kw: kw["callback"](10, 10)
+        session.put_tree(local_path=str(local_file), remote_path="/dst")
+        assert sftp_client.putfo.call_args[0][1] == "/dst"
+        sftp_client.chmod.assert_called_once_with("/dst", 0o644)
+        assert not sftp_client.mkdir.called
+        assert not scp_put.called
+
+    def test_sftp_unavailable_falls_back_to_scp(self, session, local_tree):
+        """Check the tree is sent by scp if sftp can't be started."""
+        with mock.patch(
+            "mbl.cli.utils.ssh.paramiko.SFTPClient.from_transport",
+            side_effect=ssh.paramiko.SSHException,
+        ):
+            with mock.patch.object(session, "put") as put:
+                session.put_tree(
+                    local_path=str(local_tree), remote_path="/dst"
+                )
+        put.assert_called_once_with(str(local_tree), "/dst", recursive=True)
+
+    def test_missing_path_raises(
+        self, session, sftp_client, scp_put, tmp_path
+    ):
+        """Check a local path which doesn't exist raises."""
+        with pytest.raises(FileNotFoundError):
+            session.put_tree(
+                local_path=str(tmp_path / "missing"), remote_path="/dst"
+            )
+        assert not scp_put.called